@@ -1,7 +1,20 @@
+import atexit
+import collections
+import datetime
+import decimal
+import itertools
 import json
+import numbers
+import numpy as np
 import psycopg2
 import os
-from psycopg2.extras import execute_values
+import struct
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from psycopg2 import sql
+from psycopg2.extras import execute_batch, execute_values
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 import warnings
 
 
@@ -10,17 +23,59 @@ if "DB_PATH" in os.environ:
 else:
     dbpath = "../config/db.json"
 
+# maximum number of connections kept open per database
+poolMaxConn = int(os.environ.get("DB_POOL_MAXCONN", 10))
+
 # monkey patch the warnings to suppress the output of warnings.warn(notice)
 warnings.formatwarning = lambda message, *args, **kwargs: f"{message}\n"
 
+# maximum number of notices kept per connection
+maxNotices = 100
 
-def create_connection(dbName=None, conn_kwargs=None):
-    """Create psycopg2 connection"""
+# the binary COPY format counts dates and timestamps from 2000-01-01
+_pgEpoch = datetime.datetime(2000, 1, 1)
+_pgEpochTZ = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+_pgCopyHeader = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_pgCopyTrailer = struct.pack(">h", -1)
+_pgCopyNull = struct.pack(">i", -1)
+
+# connection pools, keyed on the process id and the resolved connection arguments.
+# A forked child inherits the pools of its parent, but must not share their sockets
+_pools = {}
+_poolsLock = threading.Lock()
+
+
+def _reset_pools_lock():
+    """Replace the lock in a forked child, in case another thread of the parent held it"""
+    global _poolsLock
+    _poolsLock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_lock)
+
+
+@lru_cache(maxsize=1)
+def _load_db_config():
+    """Read and parse the ``db.json`` file only once"""
+    with open(dbpath) as dbconfig:
+        return json.load(dbconfig)
+
+
+def _connection_args(dbName=None, conn_kwargs=None):
+    """Resolve the arguments to be passed on to ``psycopg2.connect``
+
+    Returns
+    -------
+    tuple
+        A hashable key identifying the database, along with the positional
+        and keyword arguments for ``psycopg2.connect``
+    """
     if conn_kwargs is not None:
         warnings.warn(
             "The use of `conn_kwargs` is discouraged. There could be a risk of exposing your password. Please ensure that it is sufficiently protected and proceed with caution!"
         )
-        return psycopg2.connect(**conn_kwargs)
+        return ("conn_kwargs", tuple(sorted(conn_kwargs.items()))), (), dict(conn_kwargs)
 
     """In case we are in a Dash environment, we obtain the credentials from env variables"""
     if os.environ.get("DASH_APP_NAME") is not None:
@@ -31,12 +86,13 @@ def create_connection(dbName=None, conn_kwargs=None):
             "host": os.environ["DATABASE_HOST"],
         }
 
-        return psycopg2.connect(
-            user=params["user"], password=params["password"], database=params["database"], host=params["host"]
-        )
+        return ("dash", tuple(sorted(params.items()))), (), params
 
-    with open(dbpath) as dbconfig:
-        db = json.load(dbconfig)
+    # Allow db.json to be edited while the interpreter is running
+    if "DB_CONFIG_RELOAD" in os.environ:
+        _load_db_config.cache_clear()
+
+    db = _load_db_config()
 
     # Check whether a dbName is available
     if (dbName is None) and ("defaultDB" in db):
@@ -46,10 +102,196 @@ def create_connection(dbName=None, conn_kwargs=None):
     if dbName is None:
         raise FileNotFoundError("A database name has not been specified.")
 
-    return psycopg2.connect(db[dbName]["connection"])
+    dsn = db[dbName]["connection"]
+    return ("dbName", dbName, dsn), (dsn,), {}
+
+
+def create_connection(dbName=None, conn_kwargs=None):
+    """Create psycopg2 connection"""
+    _, args, kwargs = _connection_args(dbName, conn_kwargs)
+    return psycopg2.connect(*args, **kwargs)
+
+
+def _get_pool(key, args, kwargs):
+    """Return the connection pool for the database, creating it if necessary"""
+    key = (os.getpid(), key)
+
+    with _poolsLock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ThreadedConnectionPool(1, poolMaxConn, *args, **kwargs)
+            _pools[key] = pool
+
+    return pool
+
+
+def _getconn(pool, args, kwargs):
+    """Take a connection from the pool
+
+    Returns
+    -------
+    tuple
+        The connection, and whether it belongs to the pool. When all the
+        ``poolMaxConn`` connections are in use, a dedicated connection is
+        opened instead of failing.
+    """
+    try:
+        conn = pool.getconn()
+    except PoolError:
+        return psycopg2.connect(*args, **kwargs), False
+
+    if conn.closed:
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+
+    return conn, True
+
+
+def _putconn(pool, conn, pooled):
+    """Return a connection to the pool, or close it if it is a dedicated one"""
+    if pooled:
+        pool.putconn(conn, close=bool(conn.closed))
+    else:
+        conn.close()
+
+
+@contextmanager
+def _borrow(execute, error, dbName=None, conn_kwargs=None, name=None):
+    """Borrow a connection from the pool, run the first statement on it and
+    return the connection once we are done
+
+    ``execute`` is called with a new cursor (a server side one if ``name`` is
+    given) and runs the first statement. Pooled connections may have been
+    closed by the server in the meantime (idle timeouts, restarts, etc.),
+    which only shows once a statement fails. In that case the connection is
+    discarded and ``execute`` is run once more on another connection. Any
+    other failure raises an exception with the message ``error``.
+
+    Session state such as ``SET`` parameters, ``SET ROLE``, temporary tables
+    and prepared statements stays with the pooled connection, and carries
+    over to the later calls that get the same connection. Reset whatever was
+    changed (e.g. ``RESET ALL``, ``RESET ROLE``, ``DISCARD TEMP``) before
+    the call returns.
+
+    Yields
+    ------
+    tuple
+        The connection and the cursor ``execute`` was run with
+    """
+    try:
+        key, args, kwargs = _connection_args(dbName, conn_kwargs)
+        pool = _get_pool(key, args, kwargs)
+    except Exception:
+        raise Exception("Unable to connect to the database")
+
+    for retry in (True, False):
+        try:
+            conn, pooled = _getconn(pool, args, kwargs)
+        except Exception:
+            raise Exception("Unable to connect to the database")
+
+        # do not report the notices from whoever used this connection before us, and
+        # keep the notices bounded while the connection lives in the pool
+        conn.notices = collections.deque(maxlen=maxNotices)
+
+        try:
+            cur = conn.cursor(name) if name else conn.cursor()
+            execute(cur)
+            break
+        except psycopg2.OperationalError:
+            _putconn(pool, conn, pooled)
+            if not (retry and pooled and conn.closed):
+                raise Exception(error)
+        except Exception:
+            _putconn(pool, conn, pooled)
+            raise Exception(error)
+
+    try:
+        yield conn, cur
+    finally:
+        _putconn(pool, conn, pooled)
+
+
+def _executor(query, values):
+    """Return a function running ``query`` with ``values`` on a cursor"""
+
+    def execute(cur):
+        if values is None:
+            cur.execute(query)
+        else:
+            cur.execute(query, values)
+
+    return execute
+
+
+def _chunked(cur, chunks):
+    """Group the rows obtained by iterating over ``cur`` into lists of ``chunks`` rows"""
+    while True:
+        vals = list(itertools.islice(cur, chunks))
+        if len(vals) == 0:
+            break
+
+        yield vals
+
+
+def _emit_notices(conn, cur):
+    """Warn the user about the NOTICES postgreSQL communicated to us, e.g. DROP TABLE etc."""
+    if conn.notices:
+        warnings.warn("\n".join("".join([notice, cur.statusmessage]) for notice in conn.notices))
+        conn.notices.clear()
+
+
+def _column_array(colvals):
+    """Convert the values of a column into a 1d NumPy array
+
+    Sequences such as postgreSQL arrays are kept as objects, rather than
+    being turned into a 2d (or ragged) array. Strings are kept as objects as
+    well, as a fixed width string array pads every value to the longest one.
+    """
+    try:
+        arr = np.asarray(colvals)
+    except ValueError:
+        arr = None
+
+    if arr is None or arr.ndim != 1 or arr.dtype.kind in "US":
+        arr = np.empty(len(colvals), dtype=object)
+        for i, value in enumerate(colvals):
+            arr[i] = value
 
+    return arr
 
-def getAllData(query, values=None, dbName=None, return_colnames=False, conn_kwargs=None):
+
+def _fetch_numpy(cur, chunks=65536):
+    """Fetch the result of ``cur`` into one NumPy array per column
+
+    Rows are fetched ``chunks`` at a time and converted column by column, so
+    that only a single chunk of Python tuples is alive at any point in time.
+    """
+    columns = None
+    while True:
+        vals = cur.fetchmany(chunks)
+        if columns is None:
+            # the description of a named cursor is only available after a fetch
+            columns = {desc[0]: [] for desc in cur.description}
+        if len(vals) == 0:
+            break
+
+        for column, colvals in zip(columns.values(), zip(*vals)):
+            column.append(_column_array(colvals))
+
+    return {name: np.concatenate(column) if column else np.array([]) for name, column in columns.items()}
+
+
+@atexit.register
+def _close_pools():
+    """Close the pooled connections of this process when the interpreter exits"""
+    pid = os.getpid()
+    with _poolsLock:
+        for key in [key for key in _pools if key[0] == pid]:
+            _pools.pop(key).closeall()
+
+
+def getAllData(query, values=None, dbName=None, return_colnames=False, conn_kwargs=None, emit_notices=True, as_numpy=False):
     """query data from the database
     Query the data over here. If there is a problem with the data, it is going
     to raise an exception. Note that the location of the databases are assumed to be present within the file ``../config/db.json``.
@@ -67,53 +309,59 @@ def getAllData(query, values=None, dbName=None, return_colnames=False, conn_kwar
         Flag to return column names along with the values
     conn_kwargs: {dict}, optional
         Custom kwargs for creating psycopg2 connection.
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
+    as_numpy : {bool}, optional
+        Flag to stream the data through a server-side cursor into one NumPy
+        array per column instead of a list of tuples. ``return_colnames`` is
+        ignored as the column names are the keys of the returned dict. As
+        the query is run with ``DECLARE ... CURSOR``, it must be a ``SELECT``
+        or ``VALUES`` statement: e.g. ``INSERT ... RETURNING``, ``SHOW`` and
+        ``EXPLAIN`` fail, and must be run without ``as_numpy``.
+        (the default is False)
     Returns
     -------
-    list or None
-        A list of tuples containing the values is returned. In case
+    list, dict or None
+        A list of tuples containing the values is returned, or a dict of
+        column names to NumPy arrays if ``as_numpy`` is set. In case
         there is an error, an exception would be raised
     """
 
     vals = None
+    error = "Unable to obtain data from the database for:\n query: {}\nvalues: {} ".format(query, values)
 
-    try:
-        conn = create_connection(dbName, conn_kwargs)
-        cur = conn.cursor()
-    except Exception:
-        raise Exception("Unable to connect to the database")
+    with _borrow(_executor(query, values), error, dbName, conn_kwargs, "remote" if as_numpy else None) as (conn, cur):
 
-    try:
+        try:
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+            if as_numpy:
+                vals = _fetch_numpy(cur)
+            else:
+                # We assume that the data is small so we
+                # can download the entire thing here ...
+                # -------------------------------------------
+                vals = cur.fetchall()
 
-        # We assume that the data is small so we
-        # can download the entire thing here ...
-        # -------------------------------------------
-        vals = cur.fetchall()
-        if return_colnames:
-            colnames = [desc[0] for desc in cur.description]
-            vals = [vals]
-            vals.append(colnames)
+            if return_colnames and not as_numpy:
+                colnames = [desc[0] for desc in cur.description]
+                vals = [vals]
+                vals.append(colnames)
 
-    except Exception:
-        raise Exception("Unable to obtain data from the database for:\n query: {}\nvalues: {} ".format(query, values))
+        except Exception:
+            raise Exception(error)
 
-    try:
-        # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
-        for notice in conn.notices:
-            warnings.warn("".join([notice, cur.statusmessage]))
-        cur.close()
-        conn.close()
-    except Exception:
-        raise Exception("Unable to disconnect to the database")
+        try:
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
 
     return vals
 
 
-def getDataIterator(query, values=None, chunks=100, dbName=None, conn_kwargs=None):
+def getDataIterator(query, values=None, chunks=100, dbName=None, conn_kwargs=None, emit_notices=True):
     """Create an iterator from a largish query
     This is a generator that returns values in chunks of chunksize ``chunks``.
     Parameters
@@ -132,47 +380,38 @@ def getDataIterator(query, values=None, chunks=100, dbName=None, conn_kwargs=Non
         file ``../config/db.json``.
     conn_kwargs: {dict}, optional
         Custom kwargs for creating psycopg2 connection.
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
     Yields
     ------
     list of tuples
         A list of tuples from the query, with a maximum of ``chunks`` tuples returned at one time. In case there is an error, an exception would be raised
     """
 
-    try:
-        conn = create_connection(dbName, conn_kwargs)
-        cur = conn.cursor("remote")
-    except Exception:
-        raise Exception("Unable to connect to the database")
+    error = "Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values)
 
-    try:
+    with _borrow(_executor(query, values), error, dbName, conn_kwargs, "remote") as (conn, cur):
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+        try:
+            # iterating over a named cursor fetches ``itersize`` rows per round trip
+            cur.itersize = chunks
+            yield from _chunked(cur, chunks)
 
-        while True:
-            vals = cur.fetchmany(chunks)
-            if len(vals) == 0:
-                break
-
-            yield vals
-
-    except Exception:
-        raise Exception("Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values))
+        except Exception:
+            raise Exception(error)
 
-    try:
-        # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
-        for notice in conn.notices:
-            warnings.warn("".join([notice, cur.statusmessage]))
-        conn.close()
-    except Exception:
-        raise Exception("Unable to disconnect to the database")
+        try:
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
 
     return
 
 
-def getSingleDataIterator(query, values=None, dbName=None, conn_kwargs=None):
+def getSingleDataIterator(query, values=None, dbName=None, conn_kwargs=None, itersize=1000, emit_notices=True):
     """Create an iterator from a largish query
     This is a generator that returns values in chunks of chunksize 1.
     Parameters
@@ -188,47 +427,41 @@ def getSingleDataIterator(query, values=None, dbName=None, conn_kwargs=None):
         file ``../config/db.json``.
     conn_kwargs: {dict}, optional
         Custom kwargs for creating psycopg2 connection.
+    itersize : {number}, optional
+        The number of rows fetched from the server per network round trip. Rows
+        are still yielded one at a time. (the default is 1000)
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
     Yields
     ------
     list of tuples
         A list of tuples from the query, with a maximum of ``chunks`` tuples returned at one time. In case there is an error, an exception would be raised.
     """
 
-    try:
-        conn = create_connection(dbName, conn_kwargs)
-        cur = conn.cursor("remote")
-    except Exception:
-        raise Exception("Unable to connect to the database")
-
-    try:
-
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
+    error = "Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values)
 
-        while True:
-            vals = cur.fetchone()
-            if vals is None:
-                break
+    with _borrow(_executor(query, values), error, dbName, conn_kwargs, "remote") as (conn, cur):
 
-            yield vals
+        try:
+            # rows are fetched ``itersize`` at a time rather than one FETCH per row
+            cur.itersize = itersize
+            yield from cur
 
-    except Exception:
-        raise Exception("Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values))
+        except Exception:
+            raise Exception(error)
 
-    try:
-        # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
-        for notice in conn.notices:
-            warnings.warn("".join([notice, cur.statusmessage]))
-        conn.close()
-    except Exception:
-        raise Exception("Unable to disconnect to the database")
+        try:
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
 
     return
 
 
-def commitData(query, values=None, dbName=None, conn_kwargs=None):
+def commitData(query, values=None, dbName=None, conn_kwargs=None, emit_notices=True):
     """query data from the database
     Query the data over here. If there is a problem with
     the data, it is going to raise an exception. Your program needs to check whether there was an error with the query by checking for a ``None``
@@ -246,6 +479,8 @@ def commitData(query, values=None, dbName=None, conn_kwargs=None):
         file ``../config/db.json``.
     conn_kwargs: {dict}, optional
         Custom kwargs for creating psycopg2 connection.
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
     Returns
     -------
     True or None
@@ -254,36 +489,23 @@ def commitData(query, values=None, dbName=None, conn_kwargs=None):
 
     vals = True
 
-    try:
-        conn = create_connection(dbName, conn_kwargs)
-        cur = conn.cursor()
-    except Exception:
-        raise Exception("Unable to connect to the database")
+    error = "Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values)
 
-    try:
+    with _borrow(_executor(query, values), error, dbName, conn_kwargs) as (conn, cur):
 
-        if values is None:
-            cur.execute(query)
-        else:
-            cur.execute(query, values)
-
-    except Exception:
-        raise Exception("Unable to obtain data from the database for:\n query: {}\nvalues: {}".format(query, values))
-
-    try:
-        conn.commit()
-        # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
-        for notice in conn.notices:
-            warnings.warn("".join([notice, cur.statusmessage]))
-        cur.close()
-        conn.close()
-    except Exception:
-        raise Exception("Unable to disconnect to the database")
+        try:
+            conn.commit()
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
 
     return vals
 
 
-def commitDataList(query, values, dbName=None, conn_kwargs=None):
+def commitDataList(query, values, dbName=None, conn_kwargs=None, page_size=1000, emit_notices=True):
     """query data from the database
     Query the data over here. If there is a problem with
     the data, it is going to raise an exception. Your program needs to check whether there was an error with the query by checking for a ``None``
@@ -301,6 +523,11 @@ def commitDataList(query, values, dbName=None, conn_kwargs=None):
         file ``../config/db.json``.
     conn_kwargs: {dict}, optional
         Custom kwargs for creating psycopg2 connection.
+    page_size : {number}, optional
+        The maximum number of rows sent to the server in a single statement
+        (the default is 1000)
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
     Returns
     -------
     True or None
@@ -310,26 +537,331 @@ def commitDataList(query, values, dbName=None, conn_kwargs=None):
 
     val = True
 
-    try:
-        conn = create_connection(dbName, conn_kwargs)
-        cur = conn.cursor()
-    except Exception:
-        raise Exception("Unable to connect to the database")
+    def execute(cur):
+        execute_values(cur, query, values, page_size=page_size)
 
-    try:
-        query = cur.mogrify(query)
-        execute_values(cur, query, values)
-    except Exception:
-        raise Exception("Unable to execute query for:\n query: {}\nvalues: {}".format(query, values))
+    error = "Unable to execute query for:\n query: {}\nvalues: {}".format(query, values)
 
-    try:
-        conn.commit()
-        # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
-        for notice in conn.notices:
-            warnings.warn("".join([notice, cur.statusmessage]))
-        cur.close()
-        conn.close()
-    except Exception:
-        raise Exception("Unable to disconnect to the database")
+    with _borrow(execute, error, dbName, conn_kwargs) as (conn, cur):
+
+        try:
+            conn.commit()
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
+
+    return
+
+
+def commitDataPrepared(name, query, values, dbName=None, conn_kwargs=None, page_size=1000, emit_notices=True):
+    """commit a list of values to the database with a prepared statement
+    The ``query`` is prepared on the server once per connection under the
+    name ``name``, and is then executed for every item in ``values`` in
+    batches of ``page_size``. This saves the server from parsing and planning
+    the same statement for every row.
+    Parameters
+    ----------
+    name : {str}
+        The name under which the statement is prepared
+    query : {str}
+        The query to be prepared. Parameters are referred to as ``$1``, ``$2``, etc.
+    values : {iterable of tuples}
+        The parameters for every execution of the prepared statement
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will
+        attempt to read the name from the ``defaultDB`` item within the
+        file ``../config/db.json``.
+    conn_kwargs: {dict}, optional
+        Custom kwargs for creating psycopg2 connection.
+    page_size : {number}, optional
+        The maximum number of executions sent to the server in a single
+        round trip (the default is 1000)
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
+    Returns
+    -------
+    True or None
+        A successful completion of this function returns a ``True``.
+        In case there is an error, an exception would be raised.
+    """
+
+    val = True
+    rows = iter(values)
+    first = next(rows, None)
+
+    def prepare(cur):
+        if first is None:
+            return
+
+        # prepared statements live as long as the (pooled) connection, so
+        # a statement with the same name may exist for a different query
+        statement = (sql.SQL("PREPARE {} AS ").format(sql.Identifier(name)) + sql.SQL(query)).as_string(cur)
+        cur.execute("SELECT statement FROM pg_prepared_statements WHERE name = %s", (name,))
+        prepared = cur.fetchone()
+        if prepared is not None and prepared[0] != statement:
+            cur.execute(sql.SQL("DEALLOCATE {}").format(sql.Identifier(name)))
+            prepared = None
+        if prepared is None:
+            cur.execute(statement)
+
+    error = "Unable to execute query for:\n query: {}\nvalues: {}".format(query, values)
+
+    with _borrow(prepare, error, dbName, conn_kwargs) as (conn, cur):
+
+        try:
+            if first is not None:
+                execute = sql.SQL("EXECUTE {} ({})").format(
+                    sql.Identifier(name), sql.SQL(", ").join(sql.Placeholder() * len(first))
+                )
+                execute_batch(cur, execute, itertools.chain([first], rows), page_size=page_size)
+        except Exception:
+            raise Exception(error)
+
+        try:
+            conn.commit()
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
 
-    return 
\ No newline at end of file
+    return val
+
+
+def _timestamp_us(value, epoch):
+    """Microseconds between ``epoch`` and ``value``"""
+    delta = value - epoch
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _is_aware(value):
+    """Check whether a datetime carries a time zone"""
+    return value.tzinfo is not None and value.utcoffset() is not None
+
+
+def _check_type(value, types, pgType):
+    """Raise a ``TypeError`` if ``value`` cannot be written to a column of type ``pgType`` as is"""
+    if isinstance(value, (bool, np.bool_)) and bool not in types:
+        raise TypeError(f"Cannot write {value!r} to a {pgType} column")
+    if not isinstance(value, types):
+        raise TypeError(f"Cannot write {type(value).__name__} {value!r} to a {pgType} column")
+
+
+def _encode_bool(value, encoding):
+    _check_type(value, (bool, np.bool_), "bool")
+    return struct.pack(">?", bool(value))
+
+
+def _integer_encoder(fmt, pgType):
+    def encode(value, encoding):
+        _check_type(value, numbers.Integral, pgType)
+        return struct.pack(fmt, int(value))
+
+    return encode
+
+
+def _float_encoder(fmt, pgType):
+    def encode(value, encoding):
+        _check_type(value, (numbers.Real, decimal.Decimal), pgType)
+        return struct.pack(fmt, float(value))
+
+    return encode
+
+
+def _text_encoder(pgType):
+    def encode(value, encoding):
+        _check_type(value, str, pgType)
+        return value.encode(encoding)
+
+    return encode
+
+
+def _encode_date(value, encoding):
+    _check_type(value, datetime.date, "date")
+    return struct.pack(">i", value.toordinal() - _pgEpoch.toordinal())
+
+
+def _encode_timestamp(value, encoding):
+    _check_type(value, datetime.datetime, "timestamp")
+    if _is_aware(value):
+        # the column has no time zone, store the UTC time
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return struct.pack(">q", _timestamp_us(value, _pgEpoch))
+
+
+def _encode_timestamptz(value, encoding):
+    _check_type(value, datetime.datetime, "timestamptz")
+    if not _is_aware(value):
+        raise TypeError(f"Cannot write the naive datetime {value!r} to a timestamptz column, use binary=False instead")
+    return struct.pack(">q", _timestamp_us(value, _pgEpochTZ))
+
+
+# encoders for COPY ... WITH (FORMAT BINARY), keyed on the type OID of the column.
+# Values are not coerced: a value of the wrong type raises a ``TypeError``
+_binaryEncoders = {
+    16: _encode_bool,
+    20: _integer_encoder(">q", "int8"),
+    21: _integer_encoder(">h", "int2"),
+    23: _integer_encoder(">i", "int4"),
+    700: _float_encoder(">f", "float4"),
+    701: _float_encoder(">d", "float8"),
+    25: _text_encoder("text"),
+    1042: _text_encoder("bpchar"),
+    1043: _text_encoder("varchar"),
+    1082: _encode_date,
+    1114: _encode_timestamp,
+    1184: _encode_timestamptz,
+}
+
+
+def _binary_copy_chunks(rows, encoders, encoding):
+    """Encode ``rows`` in the binary COPY format, one row at a time"""
+    yield _pgCopyHeader
+
+    nFields = struct.pack(">h", len(encoders))
+    for row in rows:
+        buf = [nFields]
+        for encode, value in zip(encoders, row):
+            if value is None:
+                buf.append(_pgCopyNull)
+            else:
+                data = encode(value, encoding)
+                buf.append(struct.pack(">i", len(data)))
+                buf.append(data)
+
+        yield b"".join(buf)
+
+    yield _pgCopyTrailer
+
+
+def _text_copy_value(value):
+    """Format a single value for the text COPY format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime.datetime) and _is_aware(value):
+        # same as the binary format, so that timestamp columns store the UTC time
+        value = value.astimezone(datetime.timezone.utc)
+    if isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _text_copy_chunks(rows, encoding):
+    """Encode ``rows`` in the text COPY format, one row at a time"""
+    for row in rows:
+        yield ("\t".join(map(_text_copy_value, row)) + "\n").encode(encoding)
+
+
+class _CopyStream:
+    """File-like object serving the chunks of a COPY FROM STDIN as they are read"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = bytearray()
+        self.started = False
+
+    def read(self, size=-1):
+        self.started = True
+        while size < 0 or len(self._buf) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buf.extend(chunk)
+
+        if size < 0:
+            size = len(self._buf)
+
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        return data
+
+
+def commitDataCopy(table, columns, rows, dbName=None, conn_kwargs=None, binary=True, emit_notices=True):
+    """bulk load rows into a table with COPY
+    The rows are streamed to the server with ``COPY ... FROM STDIN``, so that
+    they are never materialized as a list nor as a large SQL statement. In
+    binary mode, the types of the target columns are looked up first and
+    every value is encoded in the binary COPY format. If any of the column
+    types is not supported by the binary encoder (supported are bool, int2,
+    int4, int8, float4, float8, text, varchar, char, date, timestamp and
+    timestamptz), the text COPY format is used instead.
+    Values are not coerced in binary mode: e.g. a str in a bool column or a
+    float in an integer column raises an exception, as does a naive datetime
+    in a timestamptz column. Time zone aware datetimes are stored as UTC in
+    timestamp columns.
+    Parameters
+    ----------
+    table : {str}
+        The name of the table, optionally qualified as ``schema.table``
+    columns : {list of str}
+        The columns of the table the values in ``rows`` are for
+    rows : {iterable of tuples}
+        The rows to be inserted. ``None`` is inserted as ``NULL``.
+    dbName : {str or None}, optional
+        The name of the database to use. If this is None, the function will
+        attempt to read the name from the ``defaultDB`` item within the
+        file ``../config/db.json``.
+    conn_kwargs: {dict}, optional
+        Custom kwargs for creating psycopg2 connection.
+    binary : {bool}, optional
+        Flag to use the binary COPY format (the default is True)
+    emit_notices : {bool}, optional
+        Flag to warn about the NOTICES sent by the database (the default is True)
+    Returns
+    -------
+    True or None
+        A successful completion of this function returns a ``True``.
+        In case there is an error, an exception would be raised.
+    """
+
+    val = True
+
+    def copy(cur):
+        tableName = sql.Identifier(*table.split("."))
+        colNames = sql.SQL(", ").join(map(sql.Identifier, columns))
+        encoding = psycopg2.extensions.encodings[cur.connection.encoding]
+
+        encoders = None
+        if binary:
+            cur.execute(sql.SQL("SELECT {} FROM {} LIMIT 0").format(colNames, tableName))
+            encoders = [_binaryEncoders.get(desc.type_code) for desc in cur.description]
+            if None in encoders:
+                encoders = None
+
+        if encoders is None:
+            query = sql.SQL("COPY {} ({}) FROM STDIN").format(tableName, colNames)
+            chunks = _text_copy_chunks(rows, encoding)
+        else:
+            query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT BINARY)").format(tableName, colNames)
+            chunks = _binary_copy_chunks(rows, encoders, encoding)
+
+        stream = _CopyStream(chunks)
+        try:
+            cur.copy_expert(query, stream)
+        except psycopg2.OperationalError:
+            # the rows already read cannot be sent again on another connection
+            if stream.started:
+                raise Exception("COPY interrupted")
+            raise
+
+    error = "Unable to copy data into the table: {}\ncolumns: {}".format(table, columns)
+
+    with _borrow(copy, error, dbName, conn_kwargs) as (conn, cur):
+
+        try:
+            conn.commit()
+            # warn user if postgreSQL communicated any NOTICES to us with the last command executed e.g. DROP TABLE etc.
+            if emit_notices:
+                _emit_notices(conn, cur)
+            cur.close()
+        except Exception:
+            raise Exception("Unable to disconnect to the database")
+
+    return val
@@ -1,23 +1,67 @@
-from psycopg2 import sql
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_integer_dtype, is_object_dtype
 import numpy as np
 import numbers
 import warnings
+from functools import lru_cache, singledispatch
 from .dbconfig import DBVersionError, version_lookup
 from .databaseIO import pgIO
 
 
+@singledispatch
+def _patient_id_array(patients):
+    """
+    Convert the patient ID(s) into a 1d NumPy array
+    Raises
+    ------
+    TypeError
+        If the input is not a integer, an array, or a 1d list or tuple
+    """
+    raise TypeError("'patients' should be a non-negative integer, or a list, NumPy array, or tuple of non-negative integers")
+
+
+@_patient_id_array.register(np.ndarray)
+def _(patients):
+    # e.g. the unique values of an object column
+    if patients.dtype.kind == "O" and all(isinstance(item, numbers.Integral) for item in patients.flat):
+        try:
+            patients = patients.astype(np.int64)
+        except OverflowError:
+            raise TypeError("'patients' contains invalid patient IDs")
+
+    # arrays of any dimension are flattened
+    return patients.ravel()
+
+
+@_patient_id_array.register(list)
+@_patient_id_array.register(tuple)
+@_patient_id_array.register(numbers.Integral)
+def _(patients):
+    try:
+        patients = np.asarray(patients)
+    except (ValueError, OverflowError):
+        # ragged sequences, or IDs that do not fit in an integer array
+        raise TypeError("'patients' contains invalid patient IDs")
+
+    # nested lists and tuples are not flattened
+    if patients.ndim > 1:
+        raise TypeError("'patients' should be a non-negative integer, or a list, NumPy array, or tuple of non-negative integers")
+
+    return _patient_id_array(patients)
+
+
 def _is_patient_id(patients):
     """
     A function to check if the input ``patients`` is a valid patient ID
     Parameters
     ----------
-    patients : `list, tuple, pandas.Series, numpy.ndarray (0d or 1d)`
-        Sequence of patient IDs to be checked for validity
+    patients : `int, list, tuple, or numpy.ndarray`
+        Sequence of patient IDs to be checked for validity. Arrays are
+        flattened
     Returns
     -------
-    tuple :
-        Sequence of patient IDs as tuple data type
+    numpy.ndarray :
+        Sequence of patient IDs as a 1d NumPy array
     Raises
     ------
     TypeError
@@ -25,18 +69,12 @@ def _is_patient_id(patients):
     ValueError
         If the input contains negative values
     """
-    if isinstance(patients, np.ndarray) or isinstance(patients, tuple) or isinstance(patients, list) or isinstance(patients, numbers.Integral):
-        if isinstance(patients, np.ndarray):
-            patients = patients.flatten().tolist()
-        elif isinstance(patients, numbers.Integral):
-            patients = [patients]
-        if not all(isinstance(item, numbers.Integral) for item in patients):
-            raise TypeError("'patients' contains invalid patient IDs")
-        if not all(item > 0 for item in patients):
-            raise ValueError("'patients' contains invalid patient IDs")
-    else:
-        raise TypeError("'patients' should be a non-negative integer, or a list, NumPy array, or tuple of non-negative integers")
-    return None
+    patients = _patient_id_array(patients)
+    if patients.size > 0 and patients.dtype.kind not in "iu":
+        raise TypeError("'patients' contains invalid patient IDs")
+    if not (patients > 0).all():
+        raise ValueError("'patients' contains invalid patient IDs")
+    return patients
 
 
 def _patient_id_to_tuple(patients):
@@ -59,18 +97,10 @@ def _patient_id_to_tuple(patients):
         If the input array contains negative values
     """
     # perform error checking first
-    _is_patient_id(patients)
+    patients = _is_patient_id(patients)
 
-    # convert patients to valid tuple
-    if isinstance(patients, numbers.Integral):
-        patients = (int(patients),)
-
-    elif isinstance(patients, list) or isinstance(patients, tuple) or isinstance(patients, np.ndarray):
-        if isinstance(patients, np.ndarray):
-            patients = patients.flatten().tolist()
-        patients = tuple(patients)
-
-    return patients
+    # convert patients to valid tuple of python ints
+    return tuple(patients.tolist())
 
 
 def get_query(query, parameters=None, dbname=None):
@@ -99,6 +129,32 @@ def get_query(query, parameters=None, dbname=None):
     return df
 
 
+@singledispatch
+def _filter_to_tuple(values, dtype=str, lower=True):
+    """
+    Convert a single filter value of type ``dtype`` into a tuple
+    Raises
+    ------
+    TypeError
+        If the input is not of type ``dtype``, a list, or a tuple.
+    """
+    if not isinstance(values, dtype):
+        raise TypeError(f"'values' should be type {dtype.__name__}, a list, or a tuple")
+    return _filter_to_tuple((values,), dtype, lower)
+
+
+@_filter_to_tuple.register(list)
+@_filter_to_tuple.register(tuple)
+def _(values, dtype=str, lower=True):
+    if not all(isinstance(item, dtype) for item in values):
+        raise TypeError(f"'values' contains non-{dtype.__name__} values")
+
+    # lowercase elements if type is string
+    if dtype is str and lower:
+        return tuple([value.lower() for value in values])
+    return tuple(values)
+
+
 def _is_valid_filter(values, dtype=str):
     """
     A function to check if the input `values` is a valid filter,
@@ -114,13 +170,7 @@ def _is_valid_filter(values, dtype=str):
     TypeError
         If the input array contains invalid values.
     """
-
-    if not (isinstance(values, list) or isinstance(values, tuple) or isinstance(values, dtype)):
-        raise TypeError(f"'values' should be type {dtype.__name__}, a list, or a tuple")
-
-    if not isinstance(values, dtype):
-        if not all(isinstance(item, dtype) for item in values):
-            raise TypeError(f"'values' contains non-{dtype.__name__} values")
+    _filter_to_tuple(values, dtype, lower=False)
 
 
 def _values_to_tuple(values, dtype=str, lower=True):
@@ -143,20 +193,7 @@ def _values_to_tuple(values, dtype=str, lower=True):
     TypeError
         If the input is not a str/int, or a list or tuple of such.
     """
-    # perform error checking first
-    _is_valid_filter(values, dtype)
-
-    # convert valid output to tuple
-    if isinstance(values, dtype):
-        values = (values,)
-
-    elif isinstance(values, list) or isinstance(values, tuple):
-        values = tuple(values)
-
-    # lowercase elements if type is string
-    if dtype is str and lower:
-        values = tuple([value.lower() for value in values])
-    return values
+    return _filter_to_tuple(values, dtype, lower)
 
 
 def _is_valid_dbversion(version):
@@ -172,9 +209,8 @@ def _is_valid_dbversion(version):
         This is a custom error type, defined in dbconfig.py.
         Raises if the input does not exist in valid_dbversion.
     """
-    db_version_error = DBVersionError(version)
-    if version not in db_version_error.valid_dbversion:
-        raise db_version_error
+    if version not in version_lookup:
+        raise DBVersionError(version)
 
 
 def _make_nice_messages(your_list, last_sep=" or ", sep=", ", put_quotes=True):
@@ -200,19 +236,17 @@ def _make_nice_messages(your_list, last_sep=" or ", sep=", ", put_quotes=True):
         j = [str(i) for i in your_list]
 
     # add space accordingly
-    if list(last_sep)[0] != " ":
+    if not last_sep.startswith(" "):
         last_sep = " " + last_sep
-
-    d = {}  # add variables into dictionary keys
-    for i in (sep, last_sep):
-        if list(i)[-1] != " ":
-            d["{}".format(i)] = i + " "
-        else:
-            d["{}".format(i)] = i
+    if not last_sep.endswith(" "):
+        last_sep = last_sep + " "
+    if not sep.endswith(" "):
+        sep = sep + " "
 
     # get your list
-    list_to_return = d[str(last_sep)].join([d[str(sep)].join(j[:-1]), j[-1]] if len(j) > 2 else j)
-    return list_to_return
+    if len(j) > 2:
+        return sep.join(j[:-1]) + last_sep + j[-1]
+    return last_sep.join(j)
 
 
 def _is_valid_version_for_measurement(version):
@@ -226,6 +260,46 @@ def _is_valid_version_for_measurement(version):
         )
 
 
+def _create_table_query(df, schemaname, tablename):
+    """
+    Build the CREATE TABLE query for writing ``df`` to ``schemaname.tablename``
+    """
+    # check if any column contains a boolean (bug on pd.io.sql.get_schema())
+    bools = {c: "Boolean" for c in df.columns[df.dtypes == bool]}
+
+    # create a create table SQL query
+    query = pd.io.sql.get_schema(frame=df, name=f"{schemaname}.{tablename}", dtype=bools)
+
+    # Format the query string to remove quotes and next line
+    query = query.replace(f'"{schemaname}.{tablename}"', f'"{schemaname}".{tablename}')
+    query = query.replace("\n", "")
+    return query
+
+
+@lru_cache(maxsize=128)
+def _cached_create_table_query(schemaname, tablename, dtypes):
+    """
+    Build the CREATE TABLE query from the column names and dtypes only. This
+    is valid as long as none of the columns has to be inspected by
+    ``pd.io.sql.get_schema`` to infer its type, i.e. there are no object columns.
+    """
+    frame = pd.DataFrame({c: pd.Series(dtype=t) for c, t in dtypes})
+    return _create_table_query(frame, schemaname, tablename)
+
+
+def _copy_rows(df):
+    """
+    Iterate over the rows of ``df`` as tuples, with missing values (NaN, NaT,
+    ``pd.NA``) replaced by None so that they are written as NULL
+    """
+    rows = df.itertuples(index=False, name=None)
+    nulls = df.isna().to_numpy()
+    if not nulls.any():
+        return rows
+
+    return (tuple(None if null else value for value, null in zip(row, isnull)) for row, isnull in zip(rows, nulls))
+
+
 def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=False, dbname=None):
     """Write dataframe objects to Postgres database.
     Parameters
@@ -237,7 +311,8 @@ def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=Fal
     tablename : `str`
         Name of the table
     change_user: `str` or None
-        Name of the role to transfer ownership. Specify None if no transferring is intended, by default 'ds_role'
+        Name of the role to transfer ownership. Specify None if no transferring is intended, by default 'ds_role'.
+        The ownership is currently not transferred by this function.
     drop_ifexists : `bool`, *optional*
         Indicates if the table needs to be dropped if exists, by default False
     dbname : `str`, *optional*
@@ -253,21 +328,24 @@ def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=Fal
         warnings.warn("`change_user` argument is not string. The ownership of the table cannot be transferred!")
         change_user = None
 
-    # Check if the column names begin with an integer
-    if type(df.columns) is pd.Index:
-        if any(c[0].isdigit() for c in df):
-            warnings.warn(
-                "The dataframe contains columns with names that begin with a digit. Please rename these columns to create the tables on the database."
-            )
-            return
-
-    # The following list consists of tuples when it is a multi index hence the slice on [0]
-    elif type(df.columns) is pd.MultiIndex:
-        if any(c[0][0].isdigit() for c in df):
-            warnings.warn(
-                "The dataframe contains columns with names that begin with a digit. Please rename these columns to create the tables on the database."
-            )
-            return
+    # Check the column names in a single pass. The columns consist of tuples when
+    # it is a multi index hence the slice on [0]
+    multi_index = type(df.columns) is pd.MultiIndex
+    has_space = False
+    new_columns = []
+    if multi_index or type(df.columns) is pd.Index:
+        for c in df.columns:
+            name = c[0] if multi_index else c
+
+            # Check if the column names begin with an integer
+            if name[0].isdigit():
+                warnings.warn(
+                    "The dataframe contains columns with names that begin with a digit. Please rename these columns to create the tables on the database."
+                )
+                return
+
+            has_space = has_space or " " in name
+            new_columns.append(name.replace(" ", "_"))
 
     # Check if the table names begin with an integer
     if tablename[0].isdigit():
@@ -277,20 +355,12 @@ def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=Fal
         return
 
     # Warning if columnnames/tablenames has white spaces
-    if type(df.columns) is pd.Index:
-        if any(" " in c for c in df):
-            warnings.warn(
-                "The dataframe contains columns with names that has white spaces. These would be converted to underscores while writing to the database."
-            )
-        df.columns = [c.replace(" ", "_") for c in df]
-
-    # The following list consists of tuples when it is a multi index hence the slice on [0]
-    elif type(df.columns) is pd.MultiIndex:
-        if any(" " in c[0] for c in df):
-            warnings.warn(
-                "The dataframe contains columns with names that has white spaces. These would be converted to underscores while writing to the database."
-            )
-            df.columns = [c[0].replace(" ", "_") for c in df]
+    if has_space:
+        warnings.warn(
+            "The dataframe contains columns with names that has white spaces. These would be converted to underscores while writing to the database."
+        )
+    if type(df.columns) is pd.Index or has_space:
+        df.columns = new_columns
 
     if " " in tablename:
         warnings.warn(
@@ -298,15 +368,12 @@ def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=Fal
         )
         tablename = tablename.replace(" ", "_")
 
-    # check if any column contains a boolean (bug on pd.io.sql.get_schema())
-    bools = {c: "Boolean" for c in df.columns[df.dtypes == bool]}
-
-    # create a create table SQL query
-    query = pd.io.sql.get_schema(frame=df, name=f"{schemaname}.{tablename}", dtype=bools)
-
-    # Format the query string to remove quotes and next line
-    query = query.replace(f'"{schemaname}.{tablename}"', f'"{schemaname}".{tablename}')
-    query = query.replace("\n", "")
+    # create a create table SQL query, reusing the previous one for the same columns and dtypes
+    dtypes = tuple(df.dtypes.items())
+    if df.columns.is_unique and not any(is_object_dtype(t) for _, t in dtypes):
+        query = _cached_create_table_query(schemaname, tablename, dtypes)
+    else:
+        query = _create_table_query(df, schemaname, tablename)
 
     if drop_ifexists:
         raise NotImplementedError(
@@ -318,27 +385,18 @@ def write_db(df, schemaname, tablename, change_user="ds_role", drop_ifexists=Fal
     # Create a table on the database
     pgIO.commitData(query, dbName=dbname)
 
-    # Insert values into the table
-    query = sql.SQL("""INSERT into {}.{} values %s """).format(sql.Identifier(schemaname), sql.Identifier(tablename))
-    r = pgIO.commitDataList(query, df.values.tolist(), dbName="cdm")
-
-    if r and change_user:
-        # fill up query
-        alter_schema = sql.SQL("ALTER SCHEMA {schema_name} OWNER TO {change_user}").format(
-            schema_name=sql.Identifier(schemaname), change_user=sql.Identifier(change_user)
-        )
+    # Stream the values into the table. The column names are the ones
+    # pd.io.sql.get_schema created the table with. Object columns are created
+    # as TEXT but may hold any value (numbers, Decimals, ...), which only the
+    # text COPY format converts
+    r = pgIO.commitDataCopy(
+        f"{schemaname}.{tablename}",
+        [str(c) for c in df.columns],
+        _copy_rows(df),
+        dbName=dbname,
+        binary=not any(is_object_dtype(t) for _, t in dtypes),
+    )
 
-        alter_tables = sql.SQL("ALTER TABLE  {schema_name}.{table_name} OWNER TO {change_user}").format(
-            schema_name=sql.Identifier(schemaname),
-            table_name=sql.Identifier(tablename),
-            change_user=sql.Identifier(change_user),
-        )
-
-        # commit query
-        pgIO.commitData(alter_schema, dbName=dbname)
-        pgIO.commitData(alter_tables, dbName=dbname)
-
-        print(f"Transferred ownership to {change_user}..")
     return r
 
 
@@ -358,12 +416,12 @@ def _cohort_validator(cohort):
         raise ValueError("At least one of `patients` or `cohort` should be not None")
     if not isinstance(cohort, pd.DataFrame):
         raise TypeError("Cohort argument is to be a pandas dataframe")
-    if sorted(cohort.columns.to_numpy()) != sorted(['person_id', 'start_date', 'end_date', 'cohort_id']):
+    if set(cohort.columns) != {'person_id', 'start_date', 'end_date', 'cohort_id'} or len(cohort.columns) != 4:
         raise ValueError("Please ensure that cohort contains the columns ['person_id', 'start_date', 'end_date', 'cohort_id'] only")
-    if all(isinstance(i, numbers.Integral) for i in cohort['person_id'].to_numpy()):
-        patients = cohort['person_id'].to_numpy()
-    else:
+    # nullable integer columns (e.g. Int64) may contain missing values
+    if not is_integer_dtype(cohort['person_id']) or cohort['person_id'].isna().any():
         raise TypeError("Please ensure that cohort `person_id` is of type int")
-    if not (all(isinstance(i, np.datetime64) for i in cohort['start_date'].to_numpy()) and all(isinstance(i, np.datetime64) for i in cohort['end_date'].to_numpy())):
+    patients = cohort['person_id'].to_numpy(dtype=np.int64)
+    if not (is_datetime64_any_dtype(cohort['start_date']) and is_datetime64_any_dtype(cohort['end_date'])):
         raise (TypeError("Please ensure that cohort 'start_date' and 'end_date' are of type datetime"))
-    return 
\ No newline at end of file
+    return patients
@@ -0,0 +1,5 @@
+import os, sys
+
+# ``utilities`` uses relative imports, so it is imported as ``src.utilities``
+# from the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
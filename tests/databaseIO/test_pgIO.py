@@ -0,0 +1,215 @@
+from databaseIO import pgIO
+import datetime, struct, pytest
+
+
+def _copy(rows, oids):
+    encoders = [pgIO._binaryEncoders[oid] for oid in oids]
+    return b"".join(pgIO._binary_copy_chunks(rows, encoders, "utf-8"))
+
+
+def test_binaryCopy_header_trailer():
+    data = _copy([], [23])
+    assert data == b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8 + b"\xff\xff"
+
+
+def test_binaryCopy_row():
+    data = _copy([(1, "ab", None)], [23, 25, 701])
+    row = data[len(pgIO._pgCopyHeader):-2]
+    assert row == (
+        struct.pack(">h", 3)
+        + struct.pack(">ii", 4, 1)
+        + struct.pack(">i", 2) + b"ab"
+        + struct.pack(">i", -1)
+    )
+
+
+def test_binaryCopy_date_timestamp():
+    assert pgIO._binaryEncoders[1082](datetime.date(2000, 1, 2), "utf-8") == struct.pack(">i", 1)
+    assert pgIO._binaryEncoders[1082](datetime.date(1999, 12, 31), "utf-8") == struct.pack(">i", -1)
+
+    ts = datetime.datetime(2000, 1, 1, 0, 0, 1, 5)
+    assert pgIO._binaryEncoders[1114](ts, "utf-8") == struct.pack(">q", 1000005)
+
+    tz = datetime.timezone(datetime.timedelta(hours=8))
+    aware = datetime.datetime(2000, 1, 1, 8, 0, 1, 5, tzinfo=tz)
+    assert pgIO._binaryEncoders[1184](aware, "utf-8") == struct.pack(">q", 1000005)
+    # aware datetimes are stored as UTC in timestamp columns
+    assert pgIO._binaryEncoders[1114](aware, "utf-8") == struct.pack(">q", 1000005)
+
+
+@pytest.mark.parametrize("oid, value", [
+    (16, "f"),
+    (23, 2.7),
+    (20, True),
+    (701, "1.5"),
+    (25, 1),
+    (25, object()),
+    (1082, "2000-01-01"),
+    (1114, datetime.date(2000, 1, 1)),
+    (1184, datetime.datetime(2000, 1, 1)),
+])
+def test_binaryCopy_typeMismatch(oid, value):
+    with pytest.raises(TypeError):
+        pgIO._binaryEncoders[oid](value, "utf-8")
+
+
+def test_textCopy_value():
+    assert pgIO._text_copy_value(None) == "\\N"
+    assert pgIO._text_copy_value(True) == "t"
+    assert pgIO._text_copy_value(False) == "f"
+    assert pgIO._text_copy_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+    assert pgIO._text_copy_value(datetime.date(2020, 1, 2)) == "2020-01-02"
+
+    tz = datetime.timezone(datetime.timedelta(hours=8))
+    aware = datetime.datetime(2020, 1, 2, 8, 0, tzinfo=tz)
+    assert pgIO._text_copy_value(aware) == "2020-01-02T00:00:00+00:00"
+
+
+def test_textCopy_chunks():
+    chunks = pgIO._text_copy_chunks([(1, None, "x y"), (2, "z", "")], "utf-8")
+    assert b"".join(chunks) == b"1\t\\N\tx y\n2\tz\t\n"
+
+
+def test_copyStream():
+    stream = pgIO._CopyStream([b"abc", b"", b"defg", b"h"])
+    assert stream.read(2) == b"ab"
+    assert stream.read(5) == b"cdefg"
+    assert stream.read(5) == b"h"
+    assert stream.read(5) == b""
+
+    stream = pgIO._CopyStream([b"abc", b"def"])
+    assert stream.read() == b"abcdef"
+
+
+class _FakeConn:
+    def __init__(self, fail=None):
+        self.closed = 0
+        self.fail = fail
+        self.executed = []
+
+    def cursor(self, name=None):
+        return self
+
+    def execute(self, query, values=None):
+        if self.fail is not None:
+            self.closed = 2
+            raise self.fail
+        self.executed.append(query)
+
+    def close(self):
+        self.closed = 1
+
+
+class _FakePool:
+    def __init__(self, conns, maxconn):
+        self.conns = list(conns)
+        self.used = 0
+        self.maxconn = maxconn
+        self.returned = []
+
+    def getconn(self):
+        if self.used == self.maxconn:
+            raise pgIO.PoolError("connection pool exhausted")
+        self.used += 1
+        return self.conns.pop(0)
+
+    def putconn(self, conn, close=False):
+        self.used -= 1
+        self.returned.append((conn, close))
+
+
+@pytest.fixture
+def fakePool(monkeypatch):
+    def install(conns, maxconn=10, connect=None):
+        pool = _FakePool(conns, maxconn)
+        monkeypatch.setattr(pgIO, "_connection_args", lambda dbName, conn_kwargs: ("db", (), {}))
+        monkeypatch.setattr(pgIO, "_get_pool", lambda key, args, kwargs: pool)
+        monkeypatch.setattr(pgIO.psycopg2, "connect", lambda *args, **kwargs: connect)
+        return pool
+
+    return install
+
+
+def test_borrow_retries_dead_connection(fakePool):
+    dead, alive = _FakeConn(pgIO.psycopg2.OperationalError("server closed the connection")), _FakeConn()
+    pool = fakePool([dead, alive])
+
+    with pgIO._borrow(pgIO._executor("SELECT 2", None), "error") as (conn, cur):
+        assert conn is alive
+
+    assert alive.executed == ["SELECT 2"]
+    assert pool.returned == [(dead, True), (alive, False)]
+
+
+def test_borrow_does_not_retry_query_errors(fakePool):
+    broken = _FakeConn(pgIO.psycopg2.ProgrammingError("syntax error"))
+    pool = fakePool([broken, _FakeConn()])
+
+    with pytest.raises(Exception, match="error"):
+        with pgIO._borrow(pgIO._executor("SELEC 2", None), "error"):
+            pass
+
+    assert len(pool.conns) == 1
+
+
+def test_borrow_exhausted_pool(fakePool):
+    dedicated = _FakeConn()
+    pool = fakePool([], maxconn=0, connect=dedicated)
+
+    with pgIO._borrow(pgIO._executor("SELECT 2", None), "error") as (conn, cur):
+        assert conn is dedicated
+
+    assert dedicated.closed
+    assert pool.returned == []
+
+
+class _FakeCursor:
+    def __init__(self, names, rows):
+        self.names = names
+        self.rows = list(rows)
+        self.description = None
+
+    def fetchmany(self, size):
+        self.description = [(name,) for name in self.names]
+        vals, self.rows = self.rows[:size], self.rows[size:]
+        return vals
+
+
+def test_columnArray_text():
+    arr = pgIO._column_array(("a", "abcdef"))
+    assert arr.dtype == object
+    assert arr.tolist() == ["a", "abcdef"]
+
+
+def test_columnArray_null():
+    arr = pgIO._column_array((1, None))
+    assert arr.dtype == object
+    assert arr.tolist() == [1, None]
+
+
+def test_columnArray_array():
+    arr = pgIO._column_array(([1, 2], [3, 4]))
+    assert arr.shape == (2,)
+    assert arr.tolist() == [[1, 2], [3, 4]]
+
+    arr = pgIO._column_array(([1, 2], [3]))
+    assert arr.shape == (2,)
+
+
+def test_fetchNumpy():
+    rows = [(i, "x" * i, [i, i] if i else None) for i in range(5)]
+    vals = pgIO._fetch_numpy(_FakeCursor(["id", "name", "arr"], rows), chunks=2)
+
+    assert list(vals) == ["id", "name", "arr"]
+    assert vals["id"].dtype.kind == "i"
+    assert vals["id"].tolist() == list(range(5))
+    assert vals["name"].dtype == object
+    assert vals["name"].tolist() == ["x" * i for i in range(5)]
+    assert vals["arr"].shape == (5,)
+    assert vals["arr"].tolist() == [None, [1, 1], [2, 2], [3, 3], [4, 4]]
+
+
+def test_fetchNumpy_empty():
+    vals = pgIO._fetch_numpy(_FakeCursor(["id", "name"], []))
+    assert list(vals) == ["id", "name"]
+    assert all(len(column) == 0 for column in vals.values())
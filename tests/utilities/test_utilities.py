@@ -0,0 +1,136 @@
+from src import utilities
+from src.databaseIO import pgIO
+import decimal
+import pandas as pd
+import numpy as np
+import pytest
+
+
+def test_patientIdToTuple():
+    assert utilities._patient_id_to_tuple(3) == (3,)
+    assert utilities._patient_id_to_tuple(np.int32(3)) == (3,)
+    assert utilities._patient_id_to_tuple([1, 2]) == (1, 2)
+    assert utilities._patient_id_to_tuple((1, 2)) == (1, 2)
+    assert utilities._patient_id_to_tuple([]) == ()
+    assert utilities._patient_id_to_tuple(np.array([1, 2])) == (1, 2)
+    assert utilities._patient_id_to_tuple(np.array([1, 2], dtype=object)) == (1, 2)
+    assert utilities._patient_id_to_tuple(np.array([2**63], dtype=np.uint64)) == (2**63,)
+    assert all(type(item) is int for item in utilities._patient_id_to_tuple(np.array([1, 2])))
+
+
+def test_patientIdToTuple_flattens_arrays():
+    assert utilities._patient_id_to_tuple(np.array([[1, 2], [3, 4]])) == (1, 2, 3, 4)
+    assert utilities._patient_id_to_tuple(np.array(5)) == (5,)
+
+
+@pytest.mark.parametrize("patients", [
+    "1", 1.0, None, {1, 2}, [1, "2"], [1.0, 2.0], [[1, 2], [3, 4]], [[1, 2], [3]], ((1,), (2,)),
+    [2**64], [1, 2**64], np.array([2**64], dtype=object), np.array(["1"]), np.array([1.0]),
+])
+def test_patientIdToTuple_type_error(patients):
+    with pytest.raises(TypeError):
+        utilities._patient_id_to_tuple(patients)
+
+
+@pytest.mark.parametrize("patients", [0, -1, [1, 0], (1, -2), np.array([[1, -1]])])
+def test_patientIdToTuple_value_error(patients):
+    with pytest.raises(ValueError):
+        utilities._patient_id_to_tuple(patients)
+
+
+def test_isPatientId():
+    patients = utilities._is_patient_id([1, 2])
+    assert isinstance(patients, np.ndarray)
+    assert patients.tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("args, kwargs, expected", [
+    ([], {}, ""),
+    (["a"], {}, "'a'"),
+    (["a", "b"], {}, "'a' or 'b'"),
+    (["a", "b", "c"], {}, "'a', 'b' or 'c'"),
+    ([1, 2, 3], {"put_quotes": False}, "1, 2 or 3"),
+    (["a", "b", "c"], {"last_sep": "and"}, "'a', 'b' and 'c'"),
+    (["a", "b", "c"], {"sep": ","}, "'a', 'b' or 'c'"),
+    (["a", "b", "c"], {"last_sep": " and ", "sep": "; "}, "'a'; 'b' and 'c'"),
+])
+def test_makeNiceMessages(args, kwargs, expected):
+    assert utilities._make_nice_messages(args, **kwargs) == expected
+
+
+@pytest.mark.parametrize("args, expected", [
+    (("AbC",), ("abc",)),
+    ((["A", "b"],), ("a", "b")),
+    ((("A", "b"),), ("a", "b")),
+    (([],), ()),
+    (("A", str, False), ("A",)),
+    ((["A"], str, False), ("A",)),
+    (([1, 2], int), (1, 2)),
+    ((3, int), (3,)),
+])
+def test_valuesToTuple(args, expected):
+    assert utilities._values_to_tuple(*args) == expected
+    assert utilities._is_valid_filter(*args[:2]) is None
+
+
+@pytest.mark.parametrize("args, message", [
+    ((3,), "'values' should be type str, a list, or a tuple"),
+    (({"a"},), "'values' should be type str, a list, or a tuple"),
+    (("a", int), "'values' should be type int, a list, or a tuple"),
+    ((["a", 1],), "'values' contains non-str values"),
+])
+def test_valuesToTuple_type_error(args, message):
+    with pytest.raises(TypeError, match=message):
+        utilities._values_to_tuple(*args)
+    with pytest.raises(TypeError, match=message):
+        utilities._is_valid_filter(*args)
+
+
+def _write_frame():
+    return pd.DataFrame({
+        "a": ["a", np.nan],
+        "d": [decimal.Decimal("1.5"), None],
+        "m": ["A1", 12],
+        "f": [1.0, np.nan],
+        "t": [pd.Timestamp("2020-01-01"), pd.NaT],
+        "i": pd.Series([1, None], dtype="Int64"),
+        "b": [True, False],
+    })
+
+
+def test_copyRows_text():
+    rows = utilities._copy_rows(_write_frame())
+    data = b"".join(pgIO._text_copy_chunks(rows, "utf-8"))
+    assert data == b"a\t1.5\tA1\t1.0\t2020-01-01T00:00:00\t1\tt\n\\N\t\\N\t12\t\\N\t\\N\t\\N\tf\n"
+
+
+def test_copyRows_binary():
+    # the types pd.io.sql.get_schema creates the columns with: REAL, TIMESTAMP, INTEGER and Boolean
+    df = _write_frame()[["f", "t", "i", "b"]]
+    encoders = [pgIO._binaryEncoders[oid] for oid in (700, 1114, 23, 16)]
+    rows = list(utilities._copy_rows(df))
+    assert rows[1] == (None, None, None, False)
+
+    data = b"".join(pgIO._binary_copy_chunks(rows, encoders, "utf-8"))
+    assert data.startswith(pgIO._pgCopyHeader)
+
+
+def test_writeDb(monkeypatch):
+    calls = []
+    monkeypatch.setattr(utilities.pgIO, "commitData", lambda query, dbName=None: calls.append(query) or True)
+    monkeypatch.setattr(
+        utilities.pgIO, "commitDataCopy",
+        lambda table, columns, rows, dbName=None, binary=True: calls.append((table, columns, list(rows), binary)) or True,
+    )
+
+    assert utilities.write_db(_write_frame(), "s", "t") is True
+
+    # the table is created and the rows are copied, the ownership is not transferred
+    create, (table, columns, rows, binary) = calls
+    assert create.startswith('CREATE TABLE "s".t')
+    assert (table, columns, binary) == ("s.t", ["a", "d", "m", "f", "t", "i", "b"], False)
+    assert rows[1] == (None, None, 12, None, None, None, False)
+
+    calls.clear()
+    utilities.write_db(_write_frame()[["f", "i"]], "s", "u")
+    assert calls[1][3] is True